@@ -0,0 +1,185 @@
+"""
+Benchmark de escala para verificador.py.
+
+Genera listas M3U sintéticas (de 1k a 1M canales) con nombres y grupos realistas y mide,
+por etapa, el tiempo de reloj, la memoria pico asignada (tracemalloc) y la variación de RSS:
+
+  - parse_m3u
+  - normalize_name sobre todos los nombres
+  - ranking difflib del bucle de reparación (FASE 2)
+  - emparejamiento masivo por n-gramas (bulk_match_candidates, si NumPy/SciPy están instalados)
+  - generate_new_m3u_content
+
+Los resultados se guardan en un JSON para poder comparar cambios en el parser o el matcher:
+
+    python benchmark_verificador.py --sizes 1000 10000 100000 --output bench.json
+
+'rss_delta_kb' es la diferencia de RSS antes y después de la etapa; 'process_rss_peak_kb'
+es el pico de todo el proceso hasta ese momento (acumulado, no por etapa).
+"""
+import argparse
+import contextlib
+import difflib
+import io
+import json
+import os
+import platform
+import random
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+from verificador import parse_m3u, normalize_name, generate_new_m3u_content, bulk_match_candidates, np
+
+DEFAULT_SIZES = [1_000, 10_000, 100_000, 1_000_000]
+
+GROUPS = ['Nacionales', 'Deportes', 'Cine', 'Series', 'Infantil', 'Documentales',
+          'Música', 'Noticias', 'Autonómicas', 'Internacionales', 'Adultos', 'Eventos']
+BRANDS = ['La 1', 'La 2', 'Antena 3', 'Cuatro', 'Telecinco', 'La Sexta', 'Movistar', 'DAZN',
+          'Eurosport', 'Fox', 'AXN', 'TNT', 'Discovery', 'National Geographic', 'Disney',
+          'Nickelodeon', 'Cartoon Network', 'MTV', 'Canal Sur', 'TV3', 'Telemadrid', 'ETB',
+          'BBC', 'CNN', 'Sky', 'HBO', 'Paramount', 'Comedy Central', 'History', 'Cosmo']
+SUFFIXES = ['', 'Liga', 'F1', 'Golf', 'Series', 'Cine', 'Deportes', 'Estrenos', 'Plus', 'Max',
+            'Action', 'Kids', 'Classic', 'Premium', 'Extra']
+TAGS = ['', ' HD', ' FHD', ' 4K', ' SD', ' [ES]', ' (Backup)', ' ES', ' UHD', ' +1']
+
+
+def generate_m3u(size, seed=42):
+    """Genera el contenido de una lista M3U sintética con `size` canales."""
+    rng = random.Random(seed)
+    lines = ['#EXTM3U']
+    for i in range(size):
+        brand = rng.choice(BRANDS)
+        suffix = rng.choice(SUFFIXES)
+        name = f"{brand} {suffix}".strip()
+        if rng.random() < 0.3:
+            name += f" {rng.randint(1, 12)}"
+        name += rng.choice(TAGS)
+        group = rng.choice(GROUPS)
+        tvg_id = f"{brand.lower().replace(' ', '')}{suffix.lower()}.es" if rng.random() < 0.6 else ''
+        lines.append(f'#EXTINF:-1 tvg-id="{tvg_id}" tvg-logo="http://logos.example/{i}.png" group-title="{group}",{name}')
+        lines.append(f"http://provider{i % 7}.example:8080/live/user{i % 50}/pass/{100000 + i}.ts")
+    return '\n'.join(lines)
+
+
+def _current_rss_kb():
+    """RSS actual del proceso en KB, con psutil o /proc/self/statm (None si no está disponible)."""
+    if psutil is not None:
+        return psutil.Process().memory_info().rss // 1024
+    try:
+        with open('/proc/self/statm') as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf('SC_PAGE_SIZE') // 1024
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+
+def _process_rss_peak_kb():
+    """RSS pico de todo el proceso en KB, acumulado desde su inicio (None si no está disponible)."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if sys.platform == 'darwin' else peak
+
+
+def measure(func, *args):
+    """
+    Ejecuta `func` dos veces: una cronometrada sin tracemalloc (para no distorsionar el
+    tiempo) y otra con tracemalloc para obtener la memoria pico asignada por la etapa.
+    """
+    with contextlib.redirect_stdout(io.StringIO()):
+        rss_before = _current_rss_kb()
+        start = time.perf_counter()
+        result = func(*args)
+        elapsed = time.perf_counter() - start
+        rss_after = _current_rss_kb()
+
+        tracemalloc.start()
+        func(*args)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    return result, {
+        'seconds': round(elapsed, 4),
+        'tracemalloc_peak_kb': peak // 1024,
+        'rss_delta_kb': rss_after - rss_before if rss_before is not None and rss_after is not None else None,
+        'process_rss_peak_kb': _process_rss_peak_kb(),
+    }
+
+
+def rank_candidates(failed, pool):
+    """Reproduce el ranking de la FASE 2: top 15 por difflib para cada canal fallido."""
+    for fc in failed:
+        sorted(pool, key=lambda x: difflib.SequenceMatcher(None, fc['name'], x['name']).ratio(), reverse=True)[:15]
+
+
+def run_size(size, failed_count, seed):
+    """Mide todas las etapas para una lista de `size` canales."""
+    content = generate_m3u(size, seed)
+    stages = {}
+
+    channels, stages['parse_m3u'] = measure(parse_m3u, content)
+    _, stages['normalize_name'] = measure(lambda chs: [normalize_name(c['name']) for c in chs], channels)
+
+    rng = random.Random(seed)
+    failed = rng.sample(channels, min(failed_count, len(channels)))
+    _, stages['difflib_ranking'] = measure(rank_candidates, failed, channels)
+    stages['difflib_ranking']['failed_channels'] = len(failed)
+    if failed:
+        stages['difflib_ranking']['seconds_per_failed_channel'] = round(stages['difflib_ranking']['seconds'] / len(failed), 4)
+
+    if np is not None:
+        _, stages['bulk_match_candidates'] = measure(bulk_match_candidates, failed, channels)
+        stages['bulk_match_candidates']['failed_channels'] = len(failed)
+
+    _, stages['generate_new_m3u_content'] = measure(generate_new_m3u_content, channels)
+
+    return {
+        'size': size,
+        'channels_parsed': len(channels),
+        'input_bytes': len(content.encode('utf-8')),
+        'stages': stages,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de escala de parseo y matching de verificador.py")
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES, help="Tamaños de lista a generar")
+    parser.add_argument('--failed', type=int, default=5, help="Canales fallidos a reparar en el ranking difflib")
+    parser.add_argument('--seed', type=int, default=42, help="Semilla para las listas sintéticas")
+    parser.add_argument('--output', default='benchmark_verificador.json', help="Archivo JSON de resultados")
+    args = parser.parse_args()
+
+    results = {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'seed': args.seed,
+        'runs': [],
+    }
+
+    for size in args.sizes:
+        print(f"[INFO] Midiendo lista de {size} canales...")
+        run = run_size(size, args.failed, args.seed)
+        results['runs'].append(run)
+        for stage, data in run['stages'].items():
+            print(f"  {stage:<26} {data['seconds']:>10.4f}s  {data['tracemalloc_peak_kb']:>10} KB")
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2)
+    print(f"[INFO] Resultados guardados en: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
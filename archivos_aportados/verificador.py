@@ -1,19 +1,51 @@
 import requests
 import re
+import argparse
+import json
 import dropbox
 import difflib
 import os
 import configparser
+import sqlite3
 import time
-from urllib.parse import urlparse
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from urllib.parse import urlparse, parse_qs
 from colorama import init, Fore, Style
 
+# NumPy/SciPy son opcionales: solo se usan en el emparejamiento masivo de la FASE 2
+try:
+    import numpy as np
+    from scipy import sparse
+except ImportError:
+    np = sparse = None
+
 # Inicializa colorama para que funcione en todas las terminales (Windows, Mac, Linux)
 init(autoreset=True)
 
 CONFIG_FILE = 'config.ini'
 REPAIR_FOLDER = 'm3u_reparadores'
 FINAL_FOLDER = 'REPARADOS xa Dropbox'
+CATALOG_DB = os.path.join(REPAIR_FOLDER, 'catalogo.sqlite')
+CATALOG_SNIFF_BYTES = 65536  # Bytes leídos para reconocer una lista M3U por su contenido
+CHECKPOINT_SUFFIX = '_verificacion.jsonl'
+CHECKPOINT_BATCH = 25
+# Límites por cuenta del proveedor (usuario en /live/<usuario>/... o ?username=)
+DEFAULT_WORKERS = 8
+DEFAULT_PER_ACCOUNT_LIMIT = 1
+DEFAULT_RATE_PER_SECOND = 2.0
+# Modo monitor: re-verificación continua por prioridad
+MONITOR_HISTORY_SUFFIX = '_monitor.json'
+MONITOR_PROBES_PER_MINUTE = 30
+MONITOR_BASE_INTERVAL = 3600  # Segundos tras los que un canal estable "pide" otra comprobación
+MONITOR_RECENT_CHECKS = 20
+MONITOR_SAVE_EVERY = 10
+MONITOR_FAILURE_BOOST = 3  # Multiplicador de un canal recién caído; se reparte entre los fallos seguidos
+MONITOR_DEAD_FLOOR = 0.25  # Mínimo para un canal caído hace tiempo: se sigue vigilando por si vuelve
+# Emparejamiento masivo por n-gramas de caracteres
+BULK_MATCH_NGRAM = 3
+BULK_MATCH_TOP_K = 60
+BULK_MATCH_MAX_CELLS = 4_000_000  # Puntuaciones densas por bloque (~32 MB), acota la memoria
 
 def load_config():
     """Carga la configuración desde el archivo config.ini."""
@@ -75,6 +107,166 @@ def check_channel(channel_url, session):
     except requests.exceptions.RequestException:
         return 'failed'
 
+# Planificador por cuenta: copia de aws-lambda/provider_scheduler.py, que es la versión de
+# referencia. Se duplica porque este script se distribuye como un único archivo y no se
+# despliega con las Lambdas; cualquier cambio debe hacerse allí primero y copiarse aquí.
+def account_key(url):
+    """Deriva la cuenta del proveedor de una URL: 'host|usuario', o solo el host si no hay usuario."""
+    parsed = urlparse(url)
+    host = parsed.netloc.lower()
+
+    query = parse_qs(parsed.query)
+    for param in ('username', 'user', 'u'):
+        if query.get(param):
+            return f"{host}|{query[param][0]}"
+
+    parts = [part for part in parsed.path.split('/') if part]
+    # Xtream Codes: /live/<usuario>/<clave>/<id>.ts
+    if len(parts) >= 4 and parts[0] in ('live', 'movie', 'series', 'timeshift'):
+        return f"{host}|{parts[1]}"
+    # Xtream Codes corto: /<usuario>/<clave>/<id>
+    if len(parts) == 3 and parts[2].split('.')[0].isdigit():
+        return f"{host}|{parts[0]}"
+
+    return host
+
+class TokenBucket:
+    """Token bucket por cuenta: 'rate' tokens por segundo con ráfagas de hasta 'capacity'."""
+
+    def __init__(self, rate, capacity=1.0):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_acquire(self, now):
+        self._refill(now)
+        if self.tokens >= 1.0:
+            self.tokens -= 1.0
+            return True
+        return False
+
+    def wait_time(self, now):
+        """Segundos hasta que haya un token disponible."""
+        self._refill(now)
+        return max(0.0, (1.0 - self.tokens) / self.rate) if self.rate > 0 else 0.0
+
+def schedule_by_account(items, url_of, worker, max_workers=DEFAULT_WORKERS,
+                        per_account_limit=DEFAULT_PER_ACCOUNT_LIMIT, rate_per_second=DEFAULT_RATE_PER_SECOND,
+                        deadline=None):
+    """
+    Ejecuta 'worker' sobre cada elemento en paralelo sin superar, por cuenta del proveedor,
+    'per_account_limit' conexiones ni 'rate_per_second' peticiones por segundo.
+    Las cuentas se intercalan en round-robin; devuelve (elemento, resultado) según van terminando.
+    Con 'deadline' (time.monotonic) no se despacha más trabajo a partir de ese instante.
+    """
+    if max_workers < 1 or per_account_limit < 1 or rate_per_second <= 0:
+        raise ValueError("max_workers, per_account_limit y rate_per_second deben ser > 0")
+
+    queues = OrderedDict()
+    for item in items:
+        queues.setdefault(account_key(url_of(item)), deque()).append(item)
+
+    buckets = {key: TokenBucket(rate_per_second) for key in queues}
+    active = {key: 0 for key in queues}
+    running = {}
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        while queues or running:
+            now = time.monotonic()
+            if deadline is not None and now >= deadline:
+                queues.clear()
+
+            next_wait = None
+            dispatched = True
+            while dispatched and queues and len(running) < max_workers:
+                dispatched = False
+                for key in list(queues):
+                    if len(running) >= max_workers:
+                        break
+                    if active[key] >= per_account_limit:
+                        continue
+                    if not buckets[key].try_acquire(now):
+                        wait_for = buckets[key].wait_time(now)
+                        next_wait = wait_for if next_wait is None else min(next_wait, wait_for)
+                        continue
+                    item = queues[key].popleft()
+                    if not queues[key]:
+                        del queues[key]
+                    else:
+                        # Mover la cuenta al final para intercalar
+                        queues.move_to_end(key)
+                    active[key] += 1
+                    running[executor.submit(worker, item)] = (key, item)
+                    dispatched = True
+
+            if not running:
+                if next_wait is not None:
+                    time.sleep(next_wait)
+                continue
+
+            # Esperar a que termine algo o a que una cuenta recupere un token
+            timeout = None
+            if queues:
+                timeout = next_wait
+                if deadline is not None:
+                    remaining = max(deadline - time.monotonic(), 0.0)
+                    timeout = remaining if timeout is None else min(timeout, remaining)
+            done, _ = wait(list(running), timeout=timeout, return_when=FIRST_COMPLETED)
+            for future in done:
+                key, item = running.pop(future)
+                active[key] -= 1
+                yield item, future.result()
+
+def load_checkpoint(checkpoint_path):
+    """Carga los resultados ya guardados de una verificación previa (url -> estado)."""
+    results = {}
+    if not os.path.exists(checkpoint_path):
+        return results
+    with open(checkpoint_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+                results[record['url']] = record['status']
+            except (ValueError, KeyError):
+                continue  # Línea incompleta por una interrupción a mitad de escritura
+    return results
+
+def verify_channels(channels, session, checkpoint_path, resume=False, workers=DEFAULT_WORKERS,
+                    per_account_limit=DEFAULT_PER_ACCOUNT_LIMIT, rate_per_second=DEFAULT_RATE_PER_SECOND):
+    """
+    FASE 1: verifica los canales añadiendo cada resultado a un checkpoint JSONL.
+    Con resume=True se saltan los canales ya verificados y se reconstruye la lista de fallidos.
+    Las comprobaciones se reparten con schedule_by_account para no superar el límite de cada cuenta.
+    Al terminar se borra el checkpoint, para que un --resume posterior no reutilice resultados viejos.
+    """
+    statuses = load_checkpoint(checkpoint_path) if resume else {}
+    done = sum(1 for c in channels if c['url'] in statuses)
+    if done:
+        failed = sum(1 for c in channels if statuses.get(c['url'], 'ok') != 'ok')
+        print(f"{Fore.YELLOW}[INFO] Reanudando: {done}/{len(channels)} canales ya verificados en {checkpoint_path} ({failed} fallidos)")
+
+    pending_channels = [c for c in channels if c['url'] not in statuses]
+    with open(checkpoint_path, 'a' if resume else 'w', encoding='utf-8') as checkpoint:
+        pending = 0
+        for channel, status in schedule_by_account(pending_channels, lambda c: c['url'], lambda c: check_channel(c['url'], session),
+                                                   workers, per_account_limit, rate_per_second):
+            done += 1
+            statuses[channel['url']] = status
+            print(f"[{done:03d}/{len(channels)}] Verificando '{channel['name']}'... " + (Fore.GREEN + "OK" if status == 'ok' else Fore.RED + "FALLO"))
+            checkpoint.write(json.dumps({'url': channel['url'], 'name': channel['name'], 'status': status}, ensure_ascii=False) + '\n')
+            pending += 1
+            if pending >= CHECKPOINT_BATCH:
+                checkpoint.flush()
+                pending = 0
+
+    os.remove(checkpoint_path)
+    return [c for c in channels if statuses[c['url']] != 'ok']
+
 def generate_new_m3u_content(channels):
     """
     Genera el contenido del nuevo archivo M3U en el orden exacto de la lista proporcionada.
@@ -137,6 +329,204 @@ def download_m3u_with_retries(url, session, save_location_folder="", max_retries
                 print(f"{Fore.RED}[ERROR] Todos los intentos de descarga fallaron.")
                 return None
 
+def open_catalog(db_path=CATALOG_DB):
+    """Abre (o crea) el catálogo SQLite con índice FTS5 de las listas reparadoras."""
+    conn = sqlite3.connect(db_path)
+    conn.row_factory = sqlite3.Row
+    conn.executescript("""
+        CREATE TABLE IF NOT EXISTS sources (
+            id INTEGER PRIMARY KEY,
+            path TEXT UNIQUE NOT NULL,
+            mtime REAL NOT NULL,
+            size INTEGER NOT NULL,
+            channel_count INTEGER NOT NULL DEFAULT 0
+        );
+        CREATE TABLE IF NOT EXISTS entries (
+            id INTEGER PRIMARY KEY,
+            url TEXT UNIQUE NOT NULL,
+            name TEXT NOT NULL,
+            norm_name TEXT NOT NULL,
+            tvg_id TEXT NOT NULL,
+            group_title TEXT NOT NULL,
+            extinf_line TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS entry_sources (
+            entry_id INTEGER NOT NULL REFERENCES entries(id),
+            source_id INTEGER NOT NULL REFERENCES sources(id),
+            PRIMARY KEY (entry_id, source_id)
+        );
+        CREATE INDEX IF NOT EXISTS idx_entries_tvg_id ON entries(tvg_id);
+        CREATE INDEX IF NOT EXISTS idx_entry_sources_source ON entry_sources(source_id);
+        CREATE VIRTUAL TABLE IF NOT EXISTS entries_fts USING fts5(norm_name, tvg_id, group_title);
+    """)
+    return conn
+
+def _remove_orphan_entries(conn):
+    """Elimina del catálogo las entradas que ya no pertenecen a ninguna lista."""
+    orphan_filter = "SELECT id FROM entries WHERE id NOT IN (SELECT entry_id FROM entry_sources)"
+    conn.execute(f"DELETE FROM entries_fts WHERE rowid IN ({orphan_filter})")
+    conn.execute(f"DELETE FROM entries WHERE id IN ({orphan_filter})")
+
+def ingest_catalog_file(conn, path, content):
+    """Indexa una lista en el catálogo, deduplicando por URL y recordando su origen."""
+    stat = os.stat(path)
+    conn.execute("INSERT OR IGNORE INTO sources (path, mtime, size) VALUES (?, ?, ?)", (path, stat.st_mtime, stat.st_size))
+    source_id = conn.execute("SELECT id FROM sources WHERE path = ?", (path,)).fetchone()['id']
+    conn.execute("DELETE FROM entry_sources WHERE source_id = ?", (source_id,))
+
+    channels = parse_m3u(content)
+    for channel in channels:
+        norm_name = normalize_name(channel['name'])
+        # Si la URL ya existe se actualizan sus datos: el proveedor pudo renombrar o reagrupar el canal
+        conn.execute(
+            """INSERT INTO entries (url, name, norm_name, tvg_id, group_title, extinf_line) VALUES (?, ?, ?, ?, ?, ?)
+               ON CONFLICT(url) DO UPDATE SET name = excluded.name, norm_name = excluded.norm_name,
+                   tvg_id = excluded.tvg_id, group_title = excluded.group_title, extinf_line = excluded.extinf_line""",
+            (channel['url'], channel['name'], norm_name, channel['tvg_id'], channel['group_title'], channel['extinf_line']))
+        entry_id = conn.execute("SELECT id FROM entries WHERE url = ?", (channel['url'],)).fetchone()['id']
+        conn.execute("DELETE FROM entries_fts WHERE rowid = ?", (entry_id,))
+        conn.execute("INSERT INTO entries_fts (rowid, norm_name, tvg_id, group_title) VALUES (?, ?, ?, ?)",
+                     (entry_id, norm_name, channel['tvg_id'], channel['group_title']))
+        conn.execute("INSERT OR IGNORE INTO entry_sources (entry_id, source_id) VALUES (?, ?)", (entry_id, source_id))
+
+    conn.execute("UPDATE sources SET mtime = ?, size = ?, channel_count = ? WHERE id = ?",
+                 (stat.st_mtime, stat.st_size, len(channels), source_id))
+    return len(channels)
+
+def is_m3u_file(path):
+    """Reconoce una lista M3U por su contenido (#EXTM3U o #EXTINF), ya que muchas se guardan sin extensión."""
+    try:
+        with open(path, 'rb') as f:
+            head = f.read(CATALOG_SNIFF_BYTES)
+    except OSError:
+        return False
+    return b'#EXTM3U' in head or b'#EXTINF' in head
+
+def update_catalog(conn, folder=REPAIR_FOLDER):
+    """Incorpora al catálogo solo las listas nuevas o modificadas de la carpeta."""
+    seen_paths = set()
+    updated = 0
+    for filename in sorted(os.listdir(folder)):
+        path = os.path.join(folder, filename)
+        if not os.path.isfile(path) or filename.startswith(os.path.basename(CATALOG_DB)):
+            continue
+        stat = os.stat(path)
+        row = conn.execute("SELECT mtime, size FROM sources WHERE path = ?", (path,)).fetchone()
+        if row and row['mtime'] == stat.st_mtime and row['size'] == stat.st_size:
+            seen_paths.add(path)
+            continue
+        if not is_m3u_file(path):
+            continue
+        seen_paths.add(path)
+        with open(path, 'r', encoding='utf-8', errors='ignore') as f:
+            content = f.read()
+        print(f"{Fore.YELLOW}[INFO] Indexando en el catálogo: {filename}")
+        ingest_catalog_file(conn, path, content)
+        updated += 1
+
+    # Listas borradas de la carpeta
+    for row in conn.execute("SELECT id, path FROM sources").fetchall():
+        if row['path'] not in seen_paths:
+            conn.execute("DELETE FROM entry_sources WHERE source_id = ?", (row['id'],))
+            conn.execute("DELETE FROM sources WHERE id = ?", (row['id'],))
+            updated += 1
+
+    if updated:
+        _remove_orphan_entries(conn)
+    conn.commit()
+    total = conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+    print(f"{Fore.GREEN}[INFO] Catálogo actualizado: {total} canales únicos de {len(seen_paths)} listas.")
+    return total
+
+def search_catalog(conn, channel, limit=200):
+    """
+    Busca candidatos para un canal en todas las listas del catálogo.
+    Las coincidencias exactas de tvg-id van primero; después, las del índice FTS5 por nombre normalizado.
+    """
+    rows = []
+    if channel.get('tvg_id'):
+        rows.extend(conn.execute("SELECT * FROM entries WHERE tvg_id = ? LIMIT ?", (channel['tvg_id'], limit)).fetchall())
+
+    tokens = re.findall(r'\w+', normalize_name(channel['name']))
+    if tokens:
+        fts_query = ' OR '.join(f'norm_name:"{token}"*' for token in tokens)
+        rows.extend(conn.execute(
+            "SELECT e.* FROM entries_fts JOIN entries e ON e.id = entries_fts.rowid "
+            "WHERE entries_fts MATCH ? ORDER BY bm25(entries_fts) LIMIT ?", (fts_query, limit)).fetchall())
+
+    results, seen_ids = [], set()
+    for row in rows:
+        if row['id'] in seen_ids: continue
+        seen_ids.add(row['id'])
+        sources = [r['path'] for r in conn.execute(
+            "SELECT s.path FROM entry_sources es JOIN sources s ON s.id = es.source_id WHERE es.entry_id = ?", (row['id'],))]
+        results.append({
+            'tvg_id': row['tvg_id'], 'group_title': row['group_title'],
+            'name': row['name'], 'url': row['url'], 'extinf_line': row['extinf_line'],
+            'status': 'pendiente', 'new_url': None, 'sources': sources
+        })
+    return results[:limit]
+
+def _char_ngrams(text, n=BULK_MATCH_NGRAM):
+    """Cuenta los n-gramas de caracteres de un nombre normalizado."""
+    padded = f" {text} "
+    counts = {}
+    for i in range(max(len(padded) - n + 1, 1)):
+        gram = padded[i:i + n]
+        counts[gram] = counts.get(gram, 0) + 1
+    return counts
+
+def _ngram_rows(names, vocabulary):
+    """Construye (datos, filas, columnas) de una matriz de n-gramas con filas normalizadas (L2)."""
+    data, rows, cols = [], [], []
+    for row, name in enumerate(names):
+        counts = _char_ngrams(name)
+        norm = sum(c * c for c in counts.values()) ** 0.5
+        for gram, count in counts.items():
+            data.append(count / norm)
+            rows.append(row)
+            cols.append(vocabulary.setdefault(gram, len(vocabulary)))
+    return data, rows, cols
+
+def bulk_match_candidates(failed_channels, search_pool, top_k=BULK_MATCH_TOP_K):
+    """
+    Calcula de una vez los mejores candidatos para todos los canales fallidos.
+    Compara vectores de n-gramas de caracteres de normalize_name() con productos de matrices
+    dispersas (similitud coseno); las coincidencias exactas de tvg-id van siempre primero.
+    Devuelve una lista (alineada con failed_channels) de listas [(canal, puntuación), ...],
+    o None si NumPy/SciPy no están instalados.
+    """
+    if np is None or not failed_channels or not search_pool:
+        return None
+
+    vocabulary = {}
+    pool_data, pool_rows, pool_cols = _ngram_rows([normalize_name(c['name']) for c in search_pool], vocabulary)
+    failed_data, failed_rows, failed_cols = _ngram_rows([normalize_name(c['name']) for c in failed_channels], vocabulary)
+    shape_cols = len(vocabulary)
+    pool_matrix = sparse.csr_matrix((pool_data, (pool_rows, pool_cols)), shape=(len(search_pool), shape_cols))
+    failed_matrix = sparse.csr_matrix((failed_data, (failed_rows, failed_cols)), shape=(len(failed_channels), shape_cols))
+    pool_matrix_t = pool_matrix.T.tocsr()
+
+    by_tvg_id = {}
+    for i, c in enumerate(search_pool):
+        if c['tvg_id']: by_tvg_id.setdefault(c['tvg_id'], []).append(i)
+
+    k = min(top_k, len(search_pool))
+    chunk = max(1, BULK_MATCH_MAX_CELLS // len(search_pool))
+    table = []
+    for start in range(0, len(failed_channels), chunk):
+        scores = (failed_matrix[start:start + chunk] @ pool_matrix_t).toarray()
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        for offset, row_top in enumerate(top):
+            fc = failed_channels[start + offset]
+            row_scores = scores[offset]
+            ranked = row_top[np.argsort(-row_scores[row_top], kind='stable')]
+            exact = by_tvg_id.get(fc['tvg_id'], []) if fc['tvg_id'] else []
+            candidates = [(search_pool[i], 1.0) for i in exact]
+            candidates += [(search_pool[i], float(row_scores[i])) for i in ranked if row_scores[i] > 0 and i not in exact]
+            table.append(candidates)
+    return table
+
 def add_new_channels(final_channel_list, source_channels):
     """Función interactiva para añadir nuevos canales a la lista final."""
     if not source_channels:
@@ -216,9 +606,175 @@ def organize_channels(channel_list):
         else:
             print(f"{Fore.RED}Comando no reconocido.")
 
+def monitor_priority(channel, history, now, important_groups=()):
+    """
+    Prioridad de re-verificación de un canal: cuanto mayor, antes se comprueba.
+    Crece con el tiempo desde la última comprobación y se multiplica si el canal
+    está caído, si cambia de estado a menudo (flapping) o si su grupo es importante.
+    El impulso por caída decae con los fallos seguidos, para que un canal muerto
+    no acapare el presupuesto frente a las caídas nuevas.
+    """
+    if not history or not history.get('last_check'):
+        return float('inf')  # Nunca comprobado
+
+    priority = (now - history['last_check']) / MONITOR_BASE_INTERVAL
+    recent = history['recent']
+    if history['last_status'] != 'ok':
+        streak = 0  # Fallos seguidos desde la última transición
+        for status in reversed(recent):
+            if status == 'ok':
+                break
+            streak += 1
+        priority *= max(MONITOR_FAILURE_BOOST / max(streak, 1), MONITOR_DEAD_FLOOR)
+    if len(recent) > 1:
+        flips = sum(1 for a, b in zip(recent, recent[1:]) if a != b)
+        priority *= 1 + 2 * flips / (len(recent) - 1)
+    if channel['group_title'] in important_groups:
+        priority *= 2
+    return priority
+
+def record_monitor_result(history, status, now):
+    """
+    Actualiza el historial de un canal y devuelve True si su estado ha cambiado.
+    La primera comprobación cuenta como cambio si el canal está caído (antes se suponía online).
+    """
+    changed = history.get('last_status', 'ok') != status
+    history['last_check'] = now
+    history['last_status'] = status
+    history['checks'] = history.get('checks', 0) + 1
+    history['failures'] = history.get('failures', 0) + (status != 'ok')
+    history['changes'] = history.get('changes', 0) + changed
+    history['recent'] = (history.get('recent', []) + [status])[-MONITOR_RECENT_CHECKS:]
+    return changed
+
+def load_monitor_history(history_path):
+    """Carga el historial por canal (url -> historial) del modo monitor."""
+    if not os.path.exists(history_path):
+        return {}
+    try:
+        with open(history_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (ValueError, OSError):
+        print(f"{Fore.RED}[AVISO] No se pudo leer el historial {history_path}; se empieza de cero.")
+        return {}
+
+def save_monitor_history(history_path, histories):
+    """Guarda el historial de forma atómica para no corromperlo si se interrumpe."""
+    tmp_path = history_path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(histories, f, ensure_ascii=False)
+    os.replace(tmp_path, history_path)
+
+def run_monitor(channels, session, history_path, output_path, probes_per_minute=MONITOR_PROBES_PER_MINUTE, important_groups=()):
+    """
+    Modo monitor: re-verifica los canales indefinidamente, de uno en uno y por prioridad,
+    sin superar 'probes_per_minute'. Cada cambio de estado se anota y se reescribe
+    la lista de salida con los canales que están online en ese momento; también se
+    escribe al completar la primera pasada, aunque no haya cambios.
+    """
+    histories = load_monitor_history(history_path)
+    interval = 60.0 / probes_per_minute
+    checks = 0
+    unchecked = len({c['url'] for c in channels if not histories.get(c['url'], {}).get('last_status')})
+    output_written = False
+    print(f"{Fore.CYAN}[INFO] Monitor iniciado: {len(channels)} canales, {probes_per_minute} comprobaciones/minuto. Ctrl-C para salir.")
+
+    try:
+        while True:
+            started = time.monotonic()
+            now = time.time()
+            channel = max(channels, key=lambda c: monitor_priority(c, histories.get(c['url']), now, important_groups))
+            history = histories.setdefault(channel['url'], {})
+            previous = history.get('last_status')
+            status = check_channel(channel['url'], session)
+
+            changed = record_monitor_result(history, status, time.time())
+            if previous is None:
+                unchecked -= 1
+            if changed:
+                color = Fore.GREEN if status == 'ok' else Fore.RED
+                print(f"{color}[{time.strftime('%H:%M:%S')}] {channel['name']}: {previous or 'sin comprobar'} -> {status}")
+            if changed or (not output_written and unchecked <= 0):
+                online = [c for c in channels if histories.get(c['url'], {}).get('last_status', 'ok') == 'ok']
+                with open(output_path, 'w', encoding='utf-8') as f:
+                    f.write(generate_new_m3u_content(online))
+                output_written = True
+
+            checks += 1
+            if checks % MONITOR_SAVE_EVERY == 0:
+                save_monitor_history(history_path, histories)
+            time.sleep(max(0.0, interval - (time.monotonic() - started)))
+    except KeyboardInterrupt:
+        print(f"\n{Fore.YELLOW}[INFO] Monitor detenido tras {checks} comprobaciones.")
+    finally:
+        save_monitor_history(history_path, histories)
+
+def positive_int(value):
+    """Tipo de argparse: entero mayor que 0."""
+    try:
+        number = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"'{value}' no es un número entero")
+    if number <= 0:
+        raise argparse.ArgumentTypeError(f"debe ser mayor que 0 (recibido: {value})")
+    return number
+
+def positive_float(value):
+    """Tipo de argparse: número mayor que 0."""
+    try:
+        number = float(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"'{value}' no es un número")
+    if number <= 0:
+        raise argparse.ArgumentTypeError(f"debe ser mayor que 0 (recibido: {value})")
+    return number
+
+def parse_args():
+    """Lee los argumentos de línea de comandos."""
+    parser = argparse.ArgumentParser(description="Validador, reparador y editor de listas M3U")
+    parser.add_argument('--resume', action='store_true',
+                        help="Reanuda la FASE 1 desde el checkpoint de la última verificación interrumpida")
+    parser.add_argument('--workers', type=positive_int, default=DEFAULT_WORKERS,
+                        help="Comprobaciones simultáneas en total (por defecto: %(default)s)")
+    parser.add_argument('--per-account', type=positive_int, default=DEFAULT_PER_ACCOUNT_LIMIT,
+                        help="Conexiones simultáneas máximas por cuenta del proveedor (por defecto: %(default)s)")
+    parser.add_argument('--rate', type=positive_float, default=DEFAULT_RATE_PER_SECOND,
+                        help="Peticiones por segundo máximas por cuenta del proveedor (por defecto: %(default)s)")
+    parser.add_argument('--monitor', metavar='LISTA',
+                        help="Modo monitor: re-verifica continuamente la lista (archivo local o URL) por prioridad")
+    parser.add_argument('--ppm', type=positive_int, default=MONITOR_PROBES_PER_MINUTE,
+                        help="Comprobaciones por minuto en modo monitor (por defecto: %(default)s)")
+    parser.add_argument('--important-groups', default='',
+                        help="Grupos (group-title) separados por comas que se re-verifican con más frecuencia")
+    return parser.parse_args()
+
+def monitor_main(args):
+    """Prepara la lista y los archivos de historial/salida y arranca el modo monitor."""
+    with requests.Session() as session:
+        if os.path.exists(args.monitor):
+            with open(args.monitor, 'r', encoding='utf-8', errors='ignore') as f:
+                content = f.read()
+        else:
+            response = download_m3u_with_retries(args.monitor, session)
+            if not response: return
+            content = response.text
+
+        channels = parse_m3u(content)
+        if not channels: return
+
+        base_name = os.path.splitext(os.path.basename(urlparse(args.monitor).path))[0] or 'lista'
+        if not os.path.exists(FINAL_FOLDER): os.makedirs(FINAL_FOLDER)
+        important_groups = {g.strip() for g in args.important_groups.split(',') if g.strip()}
+        run_monitor(channels, session, f"{base_name}{MONITOR_HISTORY_SUFFIX}",
+                    os.path.join(FINAL_FOLDER, f"{base_name}_monitor.m3u"), args.ppm, important_groups)
+
 def main():
     """Función principal del script."""
+    args = parse_args()
     print_banner()
+    if args.monitor:
+        monitor_main(args)
+        return
     config = load_config()
 
     for folder in [REPAIR_FOLDER, FINAL_FOLDER]:
@@ -241,14 +797,13 @@ def main():
 
         # --- FASE 1: VERIFICACIÓN ---
         print(f"\n{Fore.CYAN}--- FASE 1: Verificando {len(channels_to_process)} canales ---")
-        failed_channels = []
-        for i, channel in enumerate(channels_to_process):
-            print(f"[{i+1:03d}/{len(channels_to_process)}] Verificando '{channel['name']}'... ", end="")
-            status = check_channel(channel['url'], session)
-            if status == 'ok': print(Fore.GREEN + "OK")
-            else:
-                print(Fore.RED + "FALLO")
-                failed_channels.append(channel)
+        checkpoint_path = f"{os.path.splitext(original_filename)[0] or 'lista'}{CHECKPOINT_SUFFIX}"
+        try:
+            failed_channels = verify_channels(channels_to_process, session, checkpoint_path, resume=args.resume, workers=args.workers,
+                                              per_account_limit=args.per_account, rate_per_second=args.rate)
+        except KeyboardInterrupt:
+            print(f"\n{Fore.YELLOW}[AVISO] Verificación interrumpida. Progreso guardado en {checkpoint_path}; usa --resume para continuar.")
+            return
         
         print(f"\n{Fore.CYAN}{Style.BRIGHT}--- Diagnóstico Completado ---")
         if not failed_channels:
@@ -260,11 +815,16 @@ def main():
         # --- FASE 2: REPARACIÓN ---
         source_channels = None
         if failed_channels and input(f"\n{Fore.WHITE}¿Quieres iniciar la FASE 2: Reparación Interactiva? (s/n): ").lower() == 's':
-            source_url = input(f"\n{Fore.WHITE}Introduce la URL de la lista M3U de origen para reparar:\n> ")
-            source_response = download_m3u_with_retries(source_url, session, save_location_folder=REPAIR_FOLDER)
+            use_catalog = input(f"\n{Fore.WHITE}¿Buscar en el catálogo local de todas las listas de '{REPAIR_FOLDER}'? (s/n): ").lower() == 's'
+            source_url = input(f"\n{Fore.WHITE}Introduce la URL de la lista M3U de origen para reparar" + (" (Enter para usar solo el catálogo)" if use_catalog else "") + ":\n> ")
+            source_response = download_m3u_with_retries(source_url, session, save_location_folder=REPAIR_FOLDER) if source_url else None
+            catalog = None
+            if use_catalog:
+                catalog = open_catalog()
+                update_catalog(catalog)
             if source_response:
                 source_channels = parse_m3u(source_response.text)
-                
+            if source_response and not catalog:
                 categories = sorted(list(set(c['group_title'] for c in source_channels)))
                 print(f"\n{Fore.CYAN}--- Selección de Categorías de Búsqueda ---")
                 for i, cat in enumerate(categories): print(f"  [{i+1}] {cat}")
@@ -276,13 +836,20 @@ def main():
                     print(f"{Fore.RED}[ERROR] Selección inválida. Se buscará en todos los canales.")
                     search_pool = source_channels
 
+            if source_response or catalog:
+                # Tabla de candidatos para todos los fallidos en una sola pasada (si NumPy/SciPy están disponibles)
+                candidate_table = None if catalog else bulk_match_candidates(failed_channels, search_pool)
                 repaired_count = 0
-                for fc in failed_channels:
+                for n, fc in enumerate(failed_channels):
                     excluded_matches = []
+                    channel_pool = search_catalog(catalog, fc) if catalog else search_pool
+                    ranked_matches = [m for m, _ in candidate_table[n]] if candidate_table else []
                     while True:
                         print(f"\n{Fore.CYAN}--- Reparando canal: {Style.BRIGHT}{fc['name']}{Style.RESET_ALL} ---")
-                        available_to_show = [m for m in search_pool if m not in excluded_matches]
-                        potential_matches = sorted(available_to_show, key=lambda x: difflib.SequenceMatcher(None, fc['name'], x['name']).ratio(), reverse=True)[:15]
+                        potential_matches = [m for m in ranked_matches if m not in excluded_matches][:15]
+                        if not potential_matches:
+                            available_to_show = [m for m in channel_pool if m not in excluded_matches]
+                            potential_matches = sorted(available_to_show, key=lambda x: difflib.SequenceMatcher(None, fc['name'], x['name']).ratio(), reverse=True)[:15]
                         
                         if not potential_matches:
                             print(f"{Fore.RED}No se encontraron más reemplazos posibles.")
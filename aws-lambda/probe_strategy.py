@@ -0,0 +1,100 @@
+"""
+Estrategia de sondeo compartida por las Lambdas de verificación
+Recuerda por host qué método (HEAD o GET con Range) y qué cabeceras funcionaron,
+para que los orígenes que rechazan HEAD cuesten una sola petición en vez de dos
+La caché vive a nivel de módulo y se conserva entre invocaciones "en caliente"
+"""
+
+import threading
+import urllib.request
+import urllib.error
+from urllib.parse import urlparse
+from typing import Dict, Any, Tuple
+
+# Códigos con los que un origen indica que no acepta HEAD
+HEAD_REJECTED_CODES = {405, 501}
+PROBE_RANGE = 'bytes=0-65535'
+PROBE_READ_BYTES = 4096  # Leer solo un poco para confirmar y cerrar la conexión
+MAX_CACHED_HOSTS = 1024
+
+_HOST_STRATEGIES: Dict[str, Dict[str, Any]] = {}
+_HOST_STRATEGIES_LOCK = threading.Lock()  # Los modos lote sondean desde varios hilos a la vez
+
+
+def get_strategy(url: str) -> Dict[str, Any]:
+    """
+    Devuelve la estrategia aprendida para el host de la URL
+
+    Returns:
+        Dict con 'method' ('HEAD' | 'GET') y 'range' (bool)
+    """
+    host = urlparse(url).netloc.lower()
+    with _HOST_STRATEGIES_LOCK:
+        return dict(_HOST_STRATEGIES.get(host, {'method': 'HEAD', 'range': True}))
+
+
+def remember_strategy(url: str, method: str, use_range: bool = True) -> None:
+    """
+    Guarda el método y cabeceras que funcionaron para el host de la URL
+    """
+    host = urlparse(url).netloc.lower()
+    with _HOST_STRATEGIES_LOCK:
+        if host not in _HOST_STRATEGIES and len(_HOST_STRATEGIES) >= MAX_CACHED_HOSTS:
+            # Descartar el host más antiguo
+            _HOST_STRATEGIES.pop(next(iter(_HOST_STRATEGIES)))
+        _HOST_STRATEGIES[host] = {'method': method, 'range': use_range}
+
+
+def probe_stream(url: str, headers: Dict[str, str], timeout: float, ssl_context) -> Tuple[int, str]:
+    """
+    Sondea un stream usando la estrategia aprendida para su host
+
+    Si el host no es conocido se intenta HEAD; si lo rechaza (405/501) se
+    recuerda y se pasa a un GET con Range que se cierra tras unos pocos bytes.
+    Los hosts ya marcados como GET van directamente al GET, sin HEAD previo.
+
+    Returns:
+        Tupla (status_code, método usado)
+
+    Raises:
+        urllib.error.HTTPError / URLError para el resto de errores
+    """
+    strategy = get_strategy(url)
+
+    if strategy['method'] == 'HEAD':
+        request = urllib.request.Request(url, headers=headers, method='HEAD')
+        try:
+            with urllib.request.urlopen(request, timeout=timeout, context=ssl_context) as response:
+                status_code = response.getcode()
+            remember_strategy(url, 'HEAD', strategy['range'])
+            return status_code, 'HEAD'
+        except urllib.error.HTTPError as e:
+            if e.code not in HEAD_REJECTED_CODES:
+                raise
+            remember_strategy(url, 'GET', strategy['range'])
+
+    return _ranged_get(url, headers, timeout, ssl_context, strategy['range'])
+
+
+def _ranged_get(url: str, headers: Dict[str, str], timeout: float, ssl_context, use_range: bool) -> Tuple[int, str]:
+    """
+    GET con cierre temprano; si el origen no acepta Range (416) se repite sin él
+    """
+    request_headers = dict(headers)
+    if use_range:
+        request_headers['Range'] = PROBE_RANGE
+    else:
+        request_headers.pop('Range', None)
+
+    request = urllib.request.Request(url, headers=request_headers, method='GET')
+    try:
+        with urllib.request.urlopen(request, timeout=timeout, context=ssl_context) as response:
+            status_code = response.getcode()
+            response.read(PROBE_READ_BYTES)
+    except urllib.error.HTTPError as e:
+        if e.code == 416 and use_range:
+            return _ranged_get(url, headers, timeout, ssl_context, use_range=False)
+        raise
+
+    remember_strategy(url, 'GET', use_range)
+    return status_code, 'GET'
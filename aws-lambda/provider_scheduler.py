@@ -0,0 +1,182 @@
+"""
+Planificador de verificaciones consciente del límite de conexiones por cuenta
+Los proveedores IPTV limitan las conexiones simultáneas por cuenta (visible en la URL
+como /live/<usuario>/<clave>/ o ?username=); sondear por encima de ese límite produce
+falsos 403/509 o baneos temporales. Este módulo agrupa las URLs por cuenta y aplica
+a cada una un límite de concurrencia y un token bucket, intercalando las cuentas
+para que el throughput total siga siendo máximo
+
+Esta es la versión de referencia. archivos_aportados/verificador.py lleva una copia de
+account_key, TokenBucket y schedule_by_account porque se distribuye como un único archivo
+fuera del paquete de las Lambdas; los cambios se hacen aquí y se copian allí
+"""
+
+import os
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from urllib.parse import urlparse, parse_qs
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional, Tuple
+
+XTREAM_PREFIXES = ('live', 'movie', 'series', 'timeshift')
+ACCOUNT_QUERY_PARAMS = ('username', 'user', 'u')
+
+DEFAULT_MAX_WORKERS = 8
+DEFAULT_PER_ACCOUNT_LIMIT = 1   # La mayoría de cuentas IPTV solo permiten 1-2 conexiones
+DEFAULT_RATE_PER_SECOND = 2.0   # Peticiones por segundo y cuenta
+
+
+def positive_env(name: str, default: Any, cast: Callable[[str], Any] = float) -> Any:
+    """
+    Lee una variable de entorno numérica que debe ser > 0
+    Si no es un número o es <= 0 se ignora (con aviso en el log) y se usa el valor por defecto
+    """
+    raw = os.environ.get(name)
+    if raw is None or raw == '':
+        return default
+    try:
+        value = cast(raw)
+    except (ValueError, TypeError):
+        value = None
+    if value is None or value <= 0:
+        print(f"Ignoring invalid {name}={raw!r}, using {default}")
+        return default
+    return value
+
+
+def account_key(url: str) -> str:
+    """
+    Deriva la clave de cuenta de una URL de stream
+
+    Returns:
+        'host|usuario' si la URL identifica una cuenta, o solo el host si no
+    """
+    parsed = urlparse(url)
+    host = parsed.netloc.lower()
+
+    query = parse_qs(parsed.query)
+    for param in ACCOUNT_QUERY_PARAMS:
+        if query.get(param):
+            return f"{host}|{query[param][0]}"
+
+    parts = [part for part in parsed.path.split('/') if part]
+    # Xtream Codes: /live/<usuario>/<clave>/<id>.ts
+    if len(parts) >= 4 and parts[0] in XTREAM_PREFIXES:
+        return f"{host}|{parts[1]}"
+    # Xtream Codes corto: /<usuario>/<clave>/<id>
+    if len(parts) == 3 and parts[2].split('.')[0].isdigit():
+        return f"{host}|{parts[0]}"
+
+    return host
+
+
+class TokenBucket:
+    """
+    Token bucket por cuenta: 'rate' tokens por segundo con ráfagas de hasta 'capacity'
+    """
+
+    def __init__(self, rate: float, capacity: float = 1.0):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_acquire(self, now: float) -> bool:
+        self._refill(now)
+        if self.tokens >= 1.0:
+            self.tokens -= 1.0
+            return True
+        return False
+
+    def wait_time(self, now: float) -> float:
+        """Segundos hasta que haya un token disponible"""
+        self._refill(now)
+        return max(0.0, (1.0 - self.tokens) / self.rate) if self.rate > 0 else 0.0
+
+
+def schedule_by_account(items: Iterable[Any],
+                        url_of: Callable[[Any], str],
+                        worker: Callable[[Any], Any],
+                        max_workers: int = DEFAULT_MAX_WORKERS,
+                        per_account_limit: int = DEFAULT_PER_ACCOUNT_LIMIT,
+                        rate_per_second: float = DEFAULT_RATE_PER_SECOND,
+                        deadline: Optional[float] = None) -> Iterator[Tuple[Any, Any]]:
+    """
+    Ejecuta 'worker' sobre cada elemento respetando los límites de cada cuenta
+
+    Las cuentas se recorren en round-robin: cuando una está saturada o sin tokens
+    se despacha trabajo de otra, en lugar de bloquear un hilo esperando.
+
+    Args:
+        items: elementos a procesar
+        url_of: función que devuelve la URL de un elemento
+        worker: función que procesa un elemento y devuelve su resultado
+        deadline: instante (time.monotonic) a partir del cual no se despacha más trabajo
+
+    Yields:
+        Tuplas (elemento, resultado) en orden de finalización
+
+    Raises:
+        ValueError si max_workers, per_account_limit o rate_per_second no son > 0
+    """
+    if max_workers < 1 or per_account_limit < 1 or rate_per_second <= 0:
+        raise ValueError('max_workers, per_account_limit and rate_per_second must be > 0')
+
+    queues: Dict[str, deque] = OrderedDict()
+    for item in items:
+        queues.setdefault(account_key(url_of(item)), deque()).append(item)
+
+    buckets = {key: TokenBucket(rate_per_second) for key in queues}
+    active = {key: 0 for key in queues}
+    running = {}
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        while queues or running:
+            now = time.monotonic()
+            if deadline is not None and now >= deadline:
+                queues.clear()
+
+            next_wait = None
+            dispatched = True
+            while dispatched and queues and len(running) < max_workers:
+                dispatched = False
+                for key in list(queues):
+                    if len(running) >= max_workers:
+                        break
+                    if active[key] >= per_account_limit:
+                        continue
+                    if not buckets[key].try_acquire(now):
+                        wait_for = buckets[key].wait_time(now)
+                        next_wait = wait_for if next_wait is None else min(next_wait, wait_for)
+                        continue
+                    item = queues[key].popleft()
+                    if not queues[key]:
+                        del queues[key]
+                    else:
+                        # Mover la cuenta al final para intercalar
+                        queues.move_to_end(key)
+                    active[key] += 1
+                    running[executor.submit(worker, item)] = (key, item)
+                    dispatched = True
+
+            if not running:
+                if next_wait is not None:
+                    time.sleep(next_wait)
+                continue
+
+            # Esperar a que termine algo o a que una cuenta recupere un token
+            timeout = None
+            if queues:
+                timeout = next_wait
+                if deadline is not None:
+                    remaining = max(deadline - time.monotonic(), 0.0)
+                    timeout = remaining if timeout is None else min(timeout, remaining)
+            done, _ = wait(list(running), timeout=timeout, return_when=FIRST_COMPLETED)
+            for future in done:
+                key, item = running.pop(future)
+                active[key] -= 1
+                yield item, future.result()
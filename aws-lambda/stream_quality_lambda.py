@@ -11,12 +11,29 @@ import urllib.error
 import ssl
 import os
 import re
-from typing import Dict, Any, Optional
+import socket
+import time
+from urllib.parse import urljoin
+from typing import Dict, Any, Optional, List, Tuple
+
+from probe_strategy import probe_stream
+from provider_scheduler import schedule_by_account, positive_env
 
 # Configuración
 FFPROBE_PATH = os.environ.get('FFPROBE_PATH', '/opt/bin/ffprobe')
 TIMEOUT_SECONDS = int(os.environ.get('TIMEOUT_SECONDS', '30'))  # Aumentado para mejor compatibilidad
 FFPROBE_TIMEOUT = 20  # Timeout específico para FFprobe (aumentado)
+THROUGHPUT_WINDOW_SECONDS = float(os.environ.get('THROUGHPUT_WINDOW_SECONDS', '8'))  # Ventana de descarga del modo throughput
+THROUGHPUT_SAFETY_MARGIN = 3.0  # Segundos que se reservan para responder antes del timeout de la Lambda
+THROUGHPUT_CHUNK_SIZE = 64 * 1024
+THROUGHPUT_STALL_TOLERANCE = 0.05  # Fracción de espera tolerada antes de marcar el stream como no sostenible
+MAX_BATCH_URLS = int(os.environ.get('MAX_BATCH_URLS', '30'))
+BATCH_SAFETY_MARGIN = 2.0  # Segundos reservados para responder con resultados parciales
+FFPROBE_MEMORY_MB = 80  # Memoria estimada por proceso FFprobe
+FFPROBE_PROCS_PER_CPU = 4  # FFprobe pasa casi todo el tiempo esperando a la red
+MAX_FFPROBE_PROCS = 12
+BATCH_PER_ACCOUNT_LIMIT = positive_env('BATCH_PER_ACCOUNT_LIMIT', 1, int)
+BATCH_RATE_PER_SECOND = positive_env('BATCH_RATE_PER_SECOND', 2.0)
 
 
 def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
@@ -25,6 +42,9 @@ def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     
     Parámetros esperados en query string:
     - url: URL del canal a verificar (requerido)
+      Si se repite (url=...&url=...) se analizan en lote con varios FFprobe a la vez
+    - mode: "quality" (por defecto) | "throughput" (opcional)
+    - window: segundos de descarga en modo throughput (opcional)
     
     Respuesta:
     {
@@ -33,14 +53,33 @@ def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
         "resolution": "1920x1080" (opcional),
         "codec": "h264, aac" (opcional),
         "bitrate": 5000000 (opcional, en bps),
+        "throughput": {...} (solo en modo throughput),
         "message": "descripción",
         "url": "url verificada"
     }
+    
+    Respuesta en lote:
+    {
+        "results": [ {respuesta individual}, ... ],
+        "pending": [ urls no analizadas por falta de tiempo ]
+    }
     """
     
     # Extraer parámetros
     query_params = event.get('queryStringParameters', {}) or {}
     stream_url = query_params.get('url')
+    stream_urls = (event.get('multiValueQueryStringParameters', {}) or {}).get('url') or []
+    
+    # Modo lote: varios url=... analizados con FFprobe en paralelo
+    if len(stream_urls) > 1:
+        return {
+            'statusCode': 200,
+            'headers': {
+                'Content-Type': 'application/json',
+                'Access-Control-Allow-Origin': '*',
+            },
+            'body': json.dumps(verify_streams_with_quality_batch(stream_urls[:MAX_BATCH_URLS], context))
+        }
     
     if not stream_url:
         return {
@@ -59,6 +98,17 @@ def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     # Verificar con calidad
     result = verify_stream_with_quality(stream_url)
     
+    # Modo throughput: medir si el origen entrega al ritmo del bitrate declarado
+    if query_params.get('mode') == 'throughput' and result['status'] == 'ok':
+        window = _parse_window(query_params.get('window'))
+        if context is not None and hasattr(context, 'get_remaining_time_in_millis'):
+            remaining = context.get_remaining_time_in_millis() / 1000.0 - THROUGHPUT_SAFETY_MARGIN
+            window = min(window, max(remaining, 0.0))
+        if window > 0:
+            result['throughput'] = measure_throughput(stream_url, result.get('bitrate'), window)
+        else:
+            result['throughput'] = {'measured': False, 'message': 'Not enough time left for throughput probe'}
+    
     return {
         'statusCode': 200,
         'headers': {
@@ -69,19 +119,83 @@ def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     }
 
 
-def verify_stream_with_quality(url: str) -> Dict[str, Any]:
+def ffprobe_pool_size() -> int:
+    """
+    Número de procesos FFprobe simultáneos según la CPU y la memoria de la Lambda
+    Se puede forzar con la variable de entorno BATCH_FFPROBE_WORKERS
+    """
+    workers = positive_env('BATCH_FFPROBE_WORKERS', None, int)
+    if workers:
+        return workers
+    
+    memory_mb = int(os.environ.get('AWS_LAMBDA_FUNCTION_MEMORY_SIZE', '1024'))
+    by_memory = (memory_mb - 128) // FFPROBE_MEMORY_MB  # Reservar memoria para el runtime de Python
+    by_cpu = (os.cpu_count() or 1) * FFPROBE_PROCS_PER_CPU
+    return max(1, min(by_memory, by_cpu, MAX_FFPROBE_PROCS))
+
+
+def verify_streams_with_quality_batch(urls: List[str], context: Any = None) -> Dict[str, Any]:
+    """
+    Verifica y analiza varias URLs en una sola invocación, con un pool acotado de FFprobe
+    
+    Las URLs se reparten con el planificador por cuenta del proveedor, así que los FFprobe
+    simultáneos sobre una misma cuenta nunca superan BATCH_PER_ACCOUNT_LIMIT. Cuando el tiempo
+    de la invocación se agota, los FFprobe en curso se matan y se devuelven los
+    resultados parciales.
+    
+    Returns:
+        Dict con 'results' (en el orden recibido), 'pending' (sin analizar o con
+        FFprobe matado por el deadline) y 'concurrency'
+    """
+    deadline = None
+    if context is not None and hasattr(context, 'get_remaining_time_in_millis'):
+        deadline = time.monotonic() + context.get_remaining_time_in_millis() / 1000.0 - BATCH_SAFETY_MARGIN
+    
+    pool_size = ffprobe_pool_size()
+    print(f"Batch quality check: {len(urls)} urls, {pool_size} FFprobe workers, "
+          f"{BATCH_PER_ACCOUNT_LIMIT} per account")
+    
+    results = {}
+    for url, result in schedule_by_account(
+            urls,
+            lambda u: u,
+            lambda u: verify_stream_with_quality(u, deadline),
+            max_workers=pool_size,
+            per_account_limit=BATCH_PER_ACCOUNT_LIMIT,
+            rate_per_second=BATCH_RATE_PER_SECOND,
+            deadline=deadline):
+        if result is not None:
+            results[url] = result
+    
+    return {
+        'results': [results[url] for url in urls if url in results],
+        'pending': [url for url in urls if url not in results],
+        # Con una sola cuenta solo corren BATCH_PER_ACCOUNT_LIMIT FFprobe a la vez
+        'concurrency': {
+            'ffprobe_workers': pool_size,
+            'per_account_limit': BATCH_PER_ACCOUNT_LIMIT,
+        },
+    }
+
+
+def verify_stream_with_quality(url: str, deadline: Optional[float] = None) -> Optional[Dict[str, Any]]:
     """
     Verifica stream y detecta calidad usando FFprobe
     
     Args:
         url: URL del stream
+        deadline: instante (time.monotonic) límite; FFprobe se mata al alcanzarlo
         
     Returns:
         Dict con status, quality, resolution, codec, bitrate, message
+        (None si se alcanzó el deadline antes de empezar o con FFprobe en curso)
     """
     
+    if deadline is not None and time.monotonic() >= deadline:
+        return None
+    
     # Primero verificar si está online con HTTP HEAD (más rápido)
-    online_check = quick_online_check(url)
+    online_check = quick_online_check(url, _time_left(10, deadline))
     if not online_check['is_online']:
         return {
             'status': 'failed',
@@ -92,7 +206,11 @@ def verify_stream_with_quality(url: str) -> Dict[str, Any]:
     
     # Si está online, analizar con FFprobe
     try:
-        quality_info = analyze_with_ffprobe(url)
+        quality_info = analyze_with_ffprobe(url, deadline)
+        
+        if not quality_info and deadline is not None and time.monotonic() >= deadline:
+            # FFprobe se mató por el deadline: la URL queda pendiente, no es "calidad desconocida"
+            return None
         
         if quality_info:
             return {
@@ -123,10 +241,20 @@ def verify_stream_with_quality(url: str) -> Dict[str, Any]:
         }
 
 
-def quick_online_check(url: str) -> Dict[str, Any]:
+def _time_left(timeout: float, deadline: Optional[float]) -> float:
     """
-    Verificación rápida HEAD para saber si el stream está online
-    Si HEAD falla con 405, intentar con GET
+    Recorta un timeout al tiempo que queda hasta el deadline, sin margen extra
+    para no invadir BATCH_SAFETY_MARGIN
+    """
+    if deadline is None:
+        return timeout
+    return min(timeout, _time_until(deadline))
+
+
+def quick_online_check(url: str, timeout: float = 10) -> Dict[str, Any]:
+    """
+    Verificación rápida para saber si el stream está online
+    Usa HEAD, o directamente un GET con Range si el host ya rechazó HEAD antes
     
     Returns:
         Dict con 'is_online' (bool) y 'message' (str)
@@ -143,41 +271,22 @@ def quick_online_check(url: str) -> Dict[str, Any]:
             'Accept': '*/*',
         }
         
-        # Intentar primero con HEAD
-        request = urllib.request.Request(url, headers=headers, method='HEAD')
-        
-        try:
-            with urllib.request.urlopen(request, timeout=10, context=ssl_context) as response:
-                status_code = response.getcode()
-                
-                if status_code in [200, 201, 202, 204, 206, 301, 302, 307, 308, 403]:
-                    return {'is_online': True, 'message': f'Online (HTTP {status_code})'}
-                else:
-                    return {'is_online': False, 'message': f'Unexpected status: {status_code}'}
+        status_code, method = probe_stream(url, headers, timeout, ssl_context)
+        via = ' via GET' if method == 'GET' else ''
         
-        except urllib.error.HTTPError as e:
-            # Si HEAD devuelve 405, intentar con GET
-            if e.code == 405:
-                request = urllib.request.Request(url, headers=headers, method='GET')
-                with urllib.request.urlopen(request, timeout=10, context=ssl_context) as response:
-                    status_code = response.getcode()
-                    # Leer solo un poco para confirmar
-                    response.read(4096)
-                    
-                    if status_code in [200, 201, 202, 204, 206, 301, 302, 307, 308, 403]:
-                        return {'is_online': True, 'message': f'Online (HTTP {status_code} via GET)'}
-                    else:
-                        return {'is_online': False, 'message': f'Unexpected status: {status_code}'}
-            else:
-                raise  # Re-lanzar otros errores HTTP
+        if status_code in [200, 201, 202, 204, 206, 301, 302, 307, 308, 403]:
+            return {'is_online': True, 'message': f'Online (HTTP {status_code}{via})'}
+        else:
+            return {'is_online': False, 'message': f'Unexpected status: {status_code}'}
     
     except Exception as e:
         return {'is_online': False, 'message': f'Connection failed: {str(e)}'}
 
 
-def analyze_with_ffprobe(url: str) -> Optional[Dict[str, Any]]:
+def analyze_with_ffprobe(url: str, deadline: Optional[float] = None) -> Optional[Dict[str, Any]]:
     """
     Analiza el stream con FFprobe para extraer información de calidad
+    Si hay deadline, el timeout de FFprobe se recorta para no sobrepasarlo
     
     Returns:
         Dict con quality, resolution, codec, bitrate o None si falla
@@ -197,14 +306,15 @@ def analyze_with_ffprobe(url: str) -> Optional[Dict[str, Any]]:
             url
         ]
         
-        print(f"Running FFprobe with {FFPROBE_TIMEOUT}s timeout")
+        ffprobe_timeout = _time_left(FFPROBE_TIMEOUT, deadline)
+        print(f"Running FFprobe with {ffprobe_timeout:.1f}s timeout")
         
-        # Ejecutar FFprobe con timeout más corto
+        # Ejecutar FFprobe con timeout más corto (subprocess.run mata el proceso al expirar)
         result = subprocess.run(
             cmd,
             capture_output=True,
             text=True,
-            timeout=FFPROBE_TIMEOUT,  # Usar timeout más corto
+            timeout=ffprobe_timeout,  # Usar timeout más corto
             check=False
         )
         
@@ -262,7 +372,7 @@ def analyze_with_ffprobe(url: str) -> Optional[Dict[str, Any]]:
         }
     
     except subprocess.TimeoutExpired:
-        print(f"FFprobe timeout after {FFPROBE_TIMEOUT}s")
+        print(f"FFprobe timeout after {ffprobe_timeout:.1f}s")
         return None
     
     except Exception as e:
@@ -270,6 +380,230 @@ def analyze_with_ffprobe(url: str) -> Optional[Dict[str, Any]]:
         return None
 
 
+def _parse_window(value: Optional[str]) -> float:
+    """
+    Convierte el parámetro 'window' en segundos, acotado entre 1 y 20
+    """
+    try:
+        window = float(value) if value else THROUGHPUT_WINDOW_SECONDS
+    except (ValueError, TypeError):
+        window = THROUGHPUT_WINDOW_SECONDS
+    return max(1.0, min(window, 20.0))
+
+
+def _open_url(url: str, timeout: float):
+    """
+    Abre una URL con GET aceptando certificados autofirmados
+    """
+    ssl_context = ssl.create_default_context()
+    ssl_context.check_hostname = False
+    ssl_context.verify_mode = ssl.CERT_NONE
+    
+    headers = {
+        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
+        'Accept': '*/*',
+    }
+    request = urllib.request.Request(url, headers=headers, method='GET')
+    return urllib.request.urlopen(request, timeout=timeout, context=ssl_context)
+
+
+def _time_until(deadline: float) -> float:
+    """
+    Segundos que quedan hasta el deadline, con un mínimo para no pasar timeout=0 al socket
+    """
+    return max(0.1, deadline - time.monotonic())
+
+
+def _read_until(response, deadline: float, size: int = THROUGHPUT_CHUNK_SIZE) -> bytes:
+    """
+    Lee de la respuesta sin que la espera del socket sobrepase el deadline
+    
+    urlopen fija el timeout del socket al abrir; aquí se recorta antes de cada lectura.
+    read1 devuelve lo que ya haya llegado, sin esperar a completar 'size'
+    """
+    sock = getattr(getattr(getattr(response, 'fp', None), 'raw', None), '_sock', None)
+    if sock is not None:
+        sock.settimeout(_time_until(deadline))
+    return response.read1(size) if hasattr(response, 'read1') else response.read(size)
+
+
+def parse_hls_variants(playlist: str, base_url: str) -> List[Tuple[int, str]]:
+    """
+    Extrae las variantes (BANDWIDTH, url) de una playlist maestra HLS
+    
+    Returns:
+        Lista de tuplas (bandwidth en bps, url absoluta) en orden de aparición
+    """
+    variants = []
+    lines = [line.strip() for line in playlist.splitlines()]
+    for i, line in enumerate(lines):
+        if not line.startswith('#EXT-X-STREAM-INF'):
+            continue
+        match = re.search(r'[:,]BANDWIDTH=(\d+)', line)
+        uri = next((l for l in lines[i + 1:] if l and not l.startswith('#')), None)
+        if match and uri:
+            variants.append((int(match.group(1)), urljoin(base_url, uri)))
+    return variants
+
+
+def parse_hls_segments(playlist: str, base_url: str) -> List[Tuple[float, str]]:
+    """
+    Extrae los segmentos (duración, url) de una playlist de medios HLS
+    """
+    segments = []
+    duration = None
+    for line in playlist.splitlines():
+        line = line.strip()
+        if line.startswith('#EXTINF:'):
+            try:
+                duration = float(line[len('#EXTINF:'):].split(',')[0])
+            except ValueError:
+                duration = None
+        elif line and not line.startswith('#') and duration is not None:
+            segments.append((duration, urljoin(base_url, line)))
+            duration = None
+    return segments
+
+
+def measure_throughput(url: str, declared_bitrate: Optional[int] = None,
+                       window_seconds: float = THROUGHPUT_WINDOW_SECONDS) -> Dict[str, Any]:
+    """
+    Descarga el stream durante una ventana acotada y compara la velocidad
+    de entrega con el bitrate declarado (FFprobe o BANDWIDTH de HLS)
+    
+    En HLS descarga segmentos completos y compara el tiempo de descarga con
+    su duración; en streams continuos (TS) lee bytes hasta agotar la ventana.
+    Cada conexión y lectura espera como mucho hasta el deadline; si el origen se
+    atasca se devuelve lo medido hasta ese momento con la espera contada como stall.
+    
+    Returns:
+        Dict con measured_bps, declared_bps, headroom_ratio, stall_ratio,
+        stall_seconds, bytes, seconds, segments, method y sustainable
+    """
+    deadline = time.monotonic() + window_seconds
+    total_bytes = 0
+    media_seconds = 0.0
+    segments_read = 0
+    method = 'progressive'
+    declared = declared_bitrate
+    timed_out = False  # El origen dejó de entregar datos antes de acabar la ventana
+    last_data = None  # Instante del último dato recibido
+    
+    try:
+        with _open_url(url, _time_until(deadline)) as response:
+            first_chunk = _read_until(response, deadline)
+            final_url = response.geturl()
+            
+            if first_chunk.lstrip().startswith(b'#EXTM3U'):
+                method = 'hls'
+                playlist = (first_chunk + response.read()).decode('utf-8', errors='ignore')
+            else:
+                # Stream continuo: medir desde el primer byte recibido, para que
+                # la conexión y el tiempo hasta el primer byte no cuenten como espera
+                start = last_data = time.monotonic()
+                try:
+                    while first_chunk and time.monotonic() < deadline:
+                        first_chunk = _read_until(response, deadline)
+                        total_bytes += len(first_chunk)
+                        last_data = time.monotonic()
+                except (socket.timeout, urllib.error.URLError, ConnectionError):
+                    # Sin datos hasta el deadline: el tiempo de espera cuenta como stall
+                    timed_out = True
+        
+        if method == 'hls':
+            variants = parse_hls_variants(playlist, final_url)
+            if variants:
+                # Medir la variante de mayor calidad, que es la que se reproduciría
+                bandwidth, variant_url = max(variants)
+                declared = declared or bandwidth
+                with _open_url(variant_url, _time_until(deadline)) as response:
+                    final_url = response.geturl()
+                    playlist = response.read().decode('utf-8', errors='ignore')
+            
+            # Empezar a medir tras obtener las playlists
+            start = last_data = time.monotonic()
+            for duration, segment_url in parse_hls_segments(playlist, final_url)[-6:]:
+                if time.monotonic() >= deadline:
+                    break
+                segment_bytes = 0
+                completed = False
+                content_length = None
+                try:
+                    with _open_url(segment_url, _time_until(deadline)) as response:
+                        content_length = response.headers.get('Content-Length')
+                        while time.monotonic() < deadline:
+                            chunk = _read_until(response, deadline)
+                            if not chunk:
+                                completed = True
+                                break
+                            segment_bytes += len(chunk)
+                            last_data = time.monotonic()
+                except (socket.timeout, urllib.error.URLError, ConnectionError):
+                    # Segmento atascado: conservar lo medido y contar la espera como stall
+                    timed_out = True
+                total_bytes += segment_bytes
+                
+                if completed:
+                    segments_read += 1
+                    media_seconds += duration
+                elif content_length and content_length.isdigit() and int(content_length) > 0:
+                    # Segmento cortado por la ventana: contar la parte descargada
+                    media_seconds += duration * min(segment_bytes / int(content_length), 1.0)
+                elif declared:
+                    media_seconds += segment_bytes * 8 / declared
+                
+                if timed_out:
+                    break
+        
+        elapsed = max(time.monotonic() - start, 0.001)
+    
+    except Exception as e:
+        return {
+            'measured': False,
+            'method': method,
+            'message': f'Throughput probe failed: {str(e)}',
+        }
+    
+    measured_bps = int(total_bytes * 8 / elapsed)
+    result = {
+        'measured': True,
+        'method': method,
+        'measured_bps': measured_bps,
+        'declared_bps': declared,
+        'bytes': total_bytes,
+        'seconds': round(elapsed, 3),
+        'segments': segments_read,
+        'timed_out': timed_out,
+        'headroom_ratio': None,
+        'stall_ratio': None,
+        'stall_seconds': None,
+        'sustainable': None,
+    }
+    
+    if method == 'progressive' and declared:
+        # Segundos de vídeo recibidos al ritmo del bitrate declarado
+        media_seconds = total_bytes * 8 / declared
+    
+    if declared:
+        result['headroom_ratio'] = round(measured_bps / declared, 3)
+    
+    if media_seconds > 0:
+        # Tiempo que el reproductor estaría esperando datos por segundo de vídeo
+        stall_seconds = max(elapsed - media_seconds, 0.0)
+        if timed_out:
+            # El tiempo sin recibir nada hasta el deadline también es espera
+            stall_seconds = max(stall_seconds, start + elapsed - last_data)
+        result['stall_seconds'] = round(stall_seconds, 3)
+        result['stall_ratio'] = round(stall_seconds / media_seconds, 3)
+        result['sustainable'] = result['stall_ratio'] <= THROUGHPUT_STALL_TOLERANCE and not timed_out
+    elif result['headroom_ratio'] is not None:
+        result['sustainable'] = result['headroom_ratio'] >= 1.0 and not timed_out
+    elif timed_out:
+        result['sustainable'] = False
+    
+    return result
+
+
 def determine_quality(width: int, height: int, bitrate: Optional[int] = None) -> str:
     """
     Determina la calidad basándose en resolución (y opcionalmente bitrate)
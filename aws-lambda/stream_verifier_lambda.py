@@ -5,14 +5,22 @@ NO detecta calidad - solo estado del stream
 """
 
 import json
+import time
 import urllib.request
 import urllib.error
 import ssl
-from typing import Dict, Any
+from typing import Dict, Any, List
+
+from probe_strategy import probe_stream
+from provider_scheduler import schedule_by_account, positive_env
 
 # Timeout configurable desde variables de entorno
 import os
 TIMEOUT_SECONDS = int(os.environ.get('TIMEOUT_SECONDS', '20'))  # Aumentado de 10 a 20 segundos
+MAX_BATCH_URLS = int(os.environ.get('MAX_BATCH_URLS', '50'))
+BATCH_PROBE_TIMEOUT = min(TIMEOUT_SECONDS, 8)  # Timeout por canal en modo lote
+BATCH_PER_ACCOUNT_LIMIT = positive_env('BATCH_PER_ACCOUNT_LIMIT', 1, int)
+BATCH_RATE_PER_SECOND = positive_env('BATCH_RATE_PER_SECOND', 2.0)
 
 
 def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
@@ -21,6 +29,8 @@ def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     
     Parámetros esperados en query string:
     - url: URL del canal a verificar (requerido)
+      Si se repite (url=...&url=...) se verifica en lote respetando
+      el límite de conexiones de cada cuenta del proveedor
     
     Respuesta:
     {
@@ -28,11 +38,28 @@ def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
         "message": "descripción del resultado",
         "url": "url verificada"
     }
+    
+    Respuesta en lote:
+    {
+        "results": [ {respuesta individual}, ... ],
+        "pending": [ urls no verificadas por falta de tiempo ]
+    }
     """
     
     # Extraer parámetros del query string
     query_params = event.get('queryStringParameters', {}) or {}
     stream_url = query_params.get('url')
+    stream_urls = (event.get('multiValueQueryStringParameters', {}) or {}).get('url') or []
+    
+    if len(stream_urls) > 1:
+        return {
+            'statusCode': 200,
+            'headers': {
+                'Content-Type': 'application/json',
+                'Access-Control-Allow-Origin': '*',
+            },
+            'body': json.dumps(verify_streams_batch(stream_urls[:MAX_BATCH_URLS], context))
+        }
     
     if not stream_url:
         return {
@@ -60,13 +87,47 @@ def lambda_handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     }
 
 
-def verify_stream_simple(url: str) -> Dict[str, Any]:
+def verify_streams_batch(urls: List[str], context: Any = None) -> Dict[str, Any]:
+    """
+    Verifica varias URLs en paralelo sin superar el límite de conexiones
+    ni el ritmo de peticiones de cada cuenta del proveedor
+    
+    Args:
+        urls: URLs de los streams a verificar
+        context: contexto de la Lambda, para dejar de despachar antes del timeout
+        
+    Returns:
+        Dict con 'results' (en el orden recibido) y 'pending'
+    """
+    deadline = None
+    if context is not None and hasattr(context, 'get_remaining_time_in_millis'):
+        remaining = context.get_remaining_time_in_millis() / 1000.0
+        deadline = time.monotonic() + remaining - BATCH_PROBE_TIMEOUT - 1
+    
+    results = {}
+    for url, result in schedule_by_account(
+            urls,
+            lambda u: u,
+            lambda u: verify_stream_simple(u, timeout=BATCH_PROBE_TIMEOUT),
+            per_account_limit=BATCH_PER_ACCOUNT_LIMIT,
+            rate_per_second=BATCH_RATE_PER_SECOND,
+            deadline=deadline):
+        results[url] = result
+    
+    return {
+        'results': [results[url] for url in urls if url in results],
+        'pending': [url for url in urls if url not in results],
+    }
+
+
+def verify_stream_simple(url: str, timeout: int = TIMEOUT_SECONDS) -> Dict[str, Any]:
     """
     Verifica si un stream está online usando una petición HTTP HEAD
-    Si HEAD falla con 405, intenta con GET
+    Si HEAD falla con 405, intenta con GET y lo recuerda para ese host
     
     Args:
         url: URL del stream a verificar
+        timeout: segundos de espera de la petición
         
     Returns:
         Dict con status ('ok' o 'failed') y mensaje
@@ -90,71 +151,45 @@ def verify_stream_simple(url: str) -> Dict[str, Any]:
             'Range': 'bytes=0-65535',  # Añadir Range header para obtener muestra
         }
         
-        # Intentar primero con HEAD
-        request = urllib.request.Request(url, headers=headers, method='HEAD')
-        
+        # HEAD, o GET con Range directamente si el host ya rechazó HEAD antes
         try:
-            # Hacer la petición con timeout
-            with urllib.request.urlopen(request, timeout=TIMEOUT_SECONDS, context=ssl_context) as response:
-                status_code = response.getcode()
-                
-                # Códigos de éxito
-                if status_code in [200, 201, 202, 204, 206, 301, 302, 307, 308]:
-                    return {
-                        'status': 'ok',
-                        'message': f'Stream is online (HTTP {status_code})',
-                        'url': url,
-                        'statusCode': status_code,
-                    }
-                # 403 a veces significa que el stream está online pero requiere headers específicos
-                elif status_code == 403:
-                    return {
-                        'status': 'ok',
-                        'message': 'Stream is online but may require authentication',
-                        'url': url,
-                        'statusCode': status_code,
-                    }
-                else:
-                    return {
-                        'status': 'failed',
-                        'message': f'Unexpected status code: {status_code}',
-                        'url': url,
-                        'statusCode': status_code,
-                    }
-        
-        except urllib.error.HTTPError as head_error:
-            # Si HEAD devuelve 405, intentar con GET
-            if head_error.code == 405:
-                request = urllib.request.Request(url, headers=headers, method='GET')
-                with urllib.request.urlopen(request, timeout=TIMEOUT_SECONDS, context=ssl_context) as response:
-                    status_code = response.getcode()
-                    # Leer solo un poco para confirmar
-                    response.read(4096)
-                    
-                    if status_code in [200, 201, 202, 204, 206, 301, 302, 307, 308, 403]:
-                        return {
-                            'status': 'ok',
-                            'message': f'Stream is online (HTTP {status_code} via GET)',
-                            'url': url,
-                            'statusCode': status_code,
-                        }
-                    else:
-                        return {
-                            'status': 'failed',
-                            'message': f'Unexpected status code: {status_code}',
-                            'url': url,
-                            'statusCode': status_code,
-                        }
+            status_code, method = probe_stream(url, headers, timeout, ssl_context)
+        except urllib.error.HTTPError as probe_error:
             # 403 puede significar que está online pero requiere autenticación
-            elif head_error.code == 403:
+            if probe_error.code == 403:
                 return {
                     'status': 'ok',
                     'message': 'Stream is online but requires authentication',
                     'url': url,
                     'statusCode': 403,
                 }
-            else:
-                raise  # Re-lanzar otros errores HTTP
+            raise  # Re-lanzar otros errores HTTP
+        
+        via = ' via GET' if method == 'GET' else ''
+        
+        # Códigos de éxito
+        if status_code in [200, 201, 202, 204, 206, 301, 302, 307, 308]:
+            return {
+                'status': 'ok',
+                'message': f'Stream is online (HTTP {status_code}{via})',
+                'url': url,
+                'statusCode': status_code,
+            }
+        # 403 a veces significa que el stream está online pero requiere headers específicos
+        elif status_code == 403:
+            return {
+                'status': 'ok',
+                'message': 'Stream is online but may require authentication',
+                'url': url,
+                'statusCode': status_code,
+            }
+        else:
+            return {
+                'status': 'failed',
+                'message': f'Unexpected status code: {status_code}',
+                'url': url,
+                'statusCode': status_code,
+            }
     
     except urllib.error.HTTPError as e:
         # Errores HTTP específicos (que no sean 405 o 403)